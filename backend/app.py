@@ -7,13 +7,27 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
 from werkzeug.utils import secure_filename
-from food_predictor import FoodClassifier
-import traceback
+import request_logging
+from embedding_index import dish_key
+import uuid
+import math
 import os
-import tensorflow as tf
+
+# Optional split deployment: when set, the model lives in inference_server.py
+# and this process never imports TensorFlow.
+# e.g. http://127.0.0.1:8500 or unix:///tmp/macromate-inference.sock
+INFERENCE_SERVER_URL = os.environ.get('INFERENCE_SERVER_URL')
+
+if INFERENCE_SERVER_URL:
+    from inference_client import RemoteFoodClassifier
+else:
+    from food_predictor import FoodClassifier
+    import tensorflow as tf
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
+request_logging.init_app(app)  # Request IDs, sampling and async JSON logs
+logger = request_logging.get_logger('app')
 
 CORS(app, origins=[
     "https://macromate-web.vercel.app",  # Your Vercel production URL
@@ -34,6 +48,16 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Initialize food classifier with retry logic
 def initialize_classifier():
+    if INFERENCE_SERVER_URL:
+        # Connects lazily, so a slow-starting inference server doesn't leave us without a classifier
+        print(f"Using inference server at {INFERENCE_SERVER_URL}")
+        return RemoteFoodClassifier(
+            INFERENCE_SERVER_URL,
+            max_idle=int(os.environ.get('INFERENCE_POOL_SIZE', 8)),
+            connect_timeout=float(os.environ.get('INFERENCE_CONNECT_TIMEOUT', 2.0)),
+            read_timeout=float(os.environ.get('INFERENCE_READ_TIMEOUT', 30.0))
+        )
+
     max_retries = 3
     for attempt in range(max_retries):
         try:
@@ -49,6 +73,11 @@ def initialize_classifier():
 print("Initializing food classifier...")
 food_classifier = initialize_classifier()
 
+def error_status(result):
+    """HTTP status for a classifier error; client errors from the inference server pass through"""
+    status = result.get('http_status', 500)
+    return status if 400 <= status < 500 else 500
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -56,7 +85,7 @@ def allowed_file(filename):
 @app.route('/api/predict/food', methods=['POST'])
 def predict_food():
     """Food prediction endpoint"""
-    if not food_classifier:
+    if not model_loaded():
         return jsonify({
             'success': False,
             'error': 'Food classifier not available. Please check server logs.'
@@ -85,7 +114,7 @@ def predict_food():
             file.save(filepath)
 
             try:
-                print(f"Processing image: {filename}")
+                logger.info('processing image', extra={'image_name': filename})
                 
                 # Make prediction
                 result = food_classifier.predict(filepath)
@@ -98,9 +127,13 @@ def predict_food():
                     return jsonify({
                         'success': False,
                         'error': result['error']
-                    }), 500
+                    }), error_status(result)
 
-                print(f"Prediction result: {result['status']}")
+                logger.info('prediction result', extra={
+                    'result_status': result['status'],
+                    'food': result.get('food') or result.get('best_guess'),
+                    'confidence': result.get('confidence')
+                })
                 return jsonify({
                     'success': True,
                     **result
@@ -110,8 +143,7 @@ def predict_food():
                 # Clean up on error
                 if os.path.exists(filepath):
                     os.remove(filepath)
-                print(f"Prediction error: {str(e)}")
-                traceback.print_exc()
+                logger.exception('prediction error')
                 return jsonify({
                     'success': False,
                     'error': f'Prediction processing failed: {str(e)}'
@@ -123,23 +155,125 @@ def predict_food():
         }), 400
 
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
-        traceback.print_exc()
+        logger.exception('unexpected error in food prediction')
         return jsonify({
             'success': False,
             'error': f'Unexpected server error: {str(e)}'
         }), 500
 
+def tensorflow_version():
+    if not food_classifier:
+        return 'Unknown'
+    if INFERENCE_SERVER_URL:
+        return food_classifier.tensorflow_version
+    return tf.__version__
+
+def model_loaded():
+    if not food_classifier:
+        return False
+    if INFERENCE_SERVER_URL:
+        return food_classifier.connected()
+    return True
+
 @app.route('/api/health/food-model', methods=['GET'])
 def food_model_health():
     """Check if food model is loaded"""
     return jsonify({
         'success': True,
-        'model_loaded': food_classifier is not None,
+        'model_loaded': model_loaded(),
         'classes_available': len(food_classifier.class_names) if food_classifier else 0,
-        'tensorflow_version': tf.__version__ if food_classifier else 'Unknown'
+        'tensorflow_version': tensorflow_version(),
+        'inference_settings': food_classifier.inference_settings if food_classifier else None,
+        'inference_mode': 'remote' if INFERENCE_SERVER_URL else 'local',
+        'registered_dishes': food_classifier.registered_dishes() if food_classifier else []
     })
 
+@app.route('/api/food/dishes', methods=['POST'])
+def register_dish():
+    """Register a new dish from a few example images (no retraining)"""
+    if not model_loaded():
+        return jsonify({
+            'success': False,
+            'error': 'Food classifier not available. Please check server logs.'
+        }), 503
+
+    name = request.form.get('name', '').strip()
+    files = [f for f in request.files.getlist('images') if f.filename]
+    if not name:
+        return jsonify({
+            'success': False,
+            'error': 'Dish name is required'
+        }), 400
+    if dish_key(name) in food_classifier.class_names:
+        return jsonify({
+            'success': False,
+            'error': f"'{dish_key(name)}' is already a trained class"
+        }), 400
+    if not files:
+        return jsonify({
+            'success': False,
+            'error': 'No reference images provided'
+        }), 400
+    if not all(allowed_file(f.filename) for f in files):
+        return jsonify({
+            'success': False,
+            'error': f'Invalid file type. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}'
+        }), 400
+
+    macros = None
+    if request.form.get('calories'):
+        try:
+            macros = {
+                'calories': float(request.form.get('calories')),
+                'protein': float(request.form.get('protein', 0)),
+                'carbs': float(request.form.get('carbs', 0)),
+                'fat': float(request.form.get('fat', 0)),
+                'serving': request.form.get('serving', '1 serving')
+            }
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Macros must be numbers'
+            }), 400
+        if any(not math.isfinite(macros[k]) or macros[k] < 0 for k in ('calories', 'protein', 'carbs', 'fat')):
+            return jsonify({
+                'success': False,
+                'error': 'Macros must be finite, non-negative numbers'
+            }), 400
+
+    filepaths = []
+    try:
+        for file in files:
+            # Unique names so images with the same filename don't overwrite each other
+            filename = f"{uuid.uuid4().hex[:8]}_{secure_filename(file.filename)}"
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            file.save(filepath)
+            filepaths.append(filepath)
+
+        result = food_classifier.register_dish(name, filepaths, macros)
+        if result['status'] == 'error':
+            return jsonify({
+                'success': False,
+                'error': result['error']
+            }), error_status(result)
+
+        return jsonify({
+            'success': True,
+            **result
+        })
+
+    except Exception as e:
+        logger.exception('dish registration error')
+        return jsonify({
+            'success': False,
+            'error': f'Dish registration failed: {str(e)}'
+        }), 500
+
+    finally:
+        for filepath in filepaths:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
 # ============================================
 # BMI CALCULATOR ENDPOINT
 # ============================================
@@ -451,14 +585,15 @@ def calculate_bodyfat():
         # ['Age', 'Weight', 'Height', 'Neck', 'Abdomen', 'Forearm', 'Wrist']
         features = np.array([[age, weight, height, neck, abdomen, forearm, wrist]])
         
-        # Debug: Print features
-        print(f"Input features: Age={age}, Weight={weight}, Height={height}, Neck={neck}, Abdomen={abdomen}, Forearm={forearm}, Wrist={wrist}")
+        logger.debug('bodyfat input features', extra={
+            'features': {'age': age, 'weight': weight, 'height': height, 'neck': neck,
+                         'abdomen': abdomen, 'forearm': forearm, 'wrist': wrist}
+        })
         
         # Make prediction
         body_fat_percentage = model.predict(features)[0]
         
-        # Debug: Print raw prediction
-        print(f"Raw prediction: {body_fat_percentage}")
+        logger.debug('bodyfat raw prediction', extra={'raw_prediction': float(body_fat_percentage)})
         
         # Clamp between reasonable values (3-50%)
         body_fat_percentage = max(3, min(body_fat_percentage, 50))
@@ -531,9 +666,7 @@ def calculate_bodyfat():
         })
         
     except Exception as e:
-        print(f"Error in bodyfat calculation: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('error in bodyfat calculation')
         return jsonify({
             'success': False,
             'error': str(e)
@@ -550,13 +683,16 @@ if __name__ == '__main__':
     print("\n" + "="*70)
     print("MACROMATE FITNESS BACKEND SERVER")
     print("="*70)
-    print(f"TensorFlow Version: {tf.__version__}")
-    print(f"Food Model Status: {'LOADED ✓' if food_classifier else 'NOT AVAILABLE'}")
+    print(f"TensorFlow Version: {tensorflow_version()}")
+    print(f"Food Model Status: {'LOADED ✓' if model_loaded() else 'NOT AVAILABLE'}")
+    if INFERENCE_SERVER_URL:
+        print(f"Inference Server: {INFERENCE_SERVER_URL}")
     if food_classifier:
         print(f"Available Food Classes: {len(food_classifier.class_names)}")
     print("\nAvailable endpoints:")
     print("  POST /api/predict/food           - Food Image Analysis (AI)")
     print("  GET  /api/health/food-model      - Food Model Health Check")
+    print("  POST /api/food/dishes            - Register New Dish (AI)")
     print("  POST /api/calculate/bmi          - BMI Calculator")
     print("  POST /api/calculate/calories     - Calorie Calculator") 
     print("  POST /api/calculate/bodyfat      - Body Fat Predictor")
@@ -0,0 +1,258 @@
+# embedding_index.py
+"""
+Nearest-centroid dish index over FoodClassifier embeddings.
+
+Each dish is represented by the normalized mean of the L2-normalized
+penultimate-layer embeddings of its reference images, so a lookup is one
+cosine-similarity matrix product. New dishes can be registered at runtime
+from a few example images without retraining.
+
+On disk the index is a JSON manifest (dish names, image counts, macros) plus
+a float32 .npy centroid matrix that is memory-mapped read-only, so every
+worker process shares the same pages. Updates hold an exclusive lock file
+next to the manifest for the whole read-modify-write, write a new matrix
+file and then atomically replace the manifest; other workers pick up the
+change on their next lookup.
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+import request_logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only
+    fcntl = None
+
+logger = request_logging.get_logger('embedding_index')
+
+EMPTY_MANIFEST = {'matrix_file': None, 'names': [], 'counts': [], 'norms': [], 'macros': {}}
+
+
+def manifest_key(path):
+    """Identity of the manifest on disk. Timestamps alone are too coarse: two
+    publishes within one clock tick share an mtime, but os.replace of a fresh
+    temp file always brings a new inode."""
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def dish_key(name):
+    """Normalize a dish name to the class_names style, e.g. 'Neer Dosa' -> 'neer_dosa'"""
+    return (name or '').strip().lower().replace(' ', '_')
+
+
+def prefer_registered_dish(match, softmax_confidence, confidence_threshold, embedding_threshold):
+    """Whether a registered-dish match should replace the softmax prediction.
+
+    The index only holds registered dishes (there are no reference images for
+    the trained classes), and the embedding comes from a ReLU layer
+    (non-negative), so cosine scores between unrelated images run high. A
+    registered dish therefore only wins when the trained head did not
+    recognize the image and the match is close. The flip side: a new dish
+    that the trained head confidently mislabels is never returned.
+    """
+    if not match:
+        return False
+    return softmax_confidence < confidence_threshold and match[1] >= embedding_threshold
+
+
+class EmbeddingIndex:
+    def __init__(self, path='dish_index.json'):
+        """Open (or lazily create) the index whose manifest lives at `path`"""
+        self.path = path
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.base = os.path.splitext(os.path.basename(path))[0]
+        self.lock = threading.Lock()
+        # (manifest, centroids) are always swapped together so lookups on
+        # other threads never pair new names with an old matrix
+        self.snapshot = (dict(EMPTY_MANIFEST), None)
+        self.manifest_key = None
+        self.failed_key = None
+        self.refresh()
+
+    def __len__(self):
+        return len(self.snapshot[0]['names'])
+
+    @property
+    def names(self):
+        return self.snapshot[0]['names']
+
+    @property
+    def macros(self):
+        return self.snapshot[0]['macros']
+
+    @contextmanager
+    def file_lock(self):
+        """Exclusive cross-process lock for updates"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path + '.lock', 'a') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def read_disk(self):
+        """Load (manifest, centroids, manifest_key) from disk, or None if there is no index yet.
+
+        Retries once in case the manifest was swapped mid-read; raises
+        RuntimeError if the manifest still can't be loaded.
+        """
+        error = None
+        for attempt in range(2):
+            try:
+                key = manifest_key(self.path)
+            except FileNotFoundError:
+                return None
+            try:
+                with open(self.path, 'r') as f:
+                    manifest = json.load(f)
+                matrix_path = os.path.join(self.directory, manifest['matrix_file'])
+                centroids = np.load(matrix_path, mmap_mode='r')
+                manifest.setdefault('macros', {})
+                return manifest, centroids, key
+            except (FileNotFoundError, ValueError, KeyError) as e:
+                error = e
+                time.sleep(0.05)
+        raise RuntimeError(f"Dish index {self.path} cannot be loaded: {error}")
+
+    def refresh(self):
+        """Re-map the index if another worker has updated it"""
+        try:
+            key = manifest_key(self.path)
+        except FileNotFoundError:
+            return
+        if key == self.manifest_key:
+            return
+
+        with self.lock:
+            try:
+                loaded = self.read_disk()
+            except RuntimeError as e:
+                # Keep serving the current mapping, but say so once per broken manifest
+                if self.failed_key != key:
+                    logger.error('dish index unreadable, serving previous mapping',
+                                 extra={'error': str(e), 'dishes': len(self)})
+                    self.failed_key = key
+                return
+            if loaded is None:
+                return
+            manifest, centroids, loaded_key = loaded
+            self.snapshot = (manifest, centroids)
+            self.manifest_key = loaded_key
+            self.failed_key = None
+
+    def lookup(self, embeddings, top_k=3):
+        """Return the top_k (name, cosine similarity) matches for each embedding in a batch"""
+        self.refresh()
+        manifest, centroids = self.snapshot
+        names = manifest['names']
+        if not names:
+            return [[] for _ in range(len(embeddings))]
+
+        queries = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        similarities = queries @ centroids.T  # (batch, dishes)
+
+        top_k = min(top_k, len(names))
+        top_idx = np.argsort(similarities, axis=1)[:, ::-1][:, :top_k]
+        return [
+            [(names[idx], float(row[idx])) for idx in row_idx]
+            for row, row_idx in zip(similarities, top_idx)
+        ]
+
+    def add(self, name, embeddings, macros=None):
+        """Add reference embeddings for a dish (new or existing) and persist the index"""
+        embeddings = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if embeddings.ndim != 2 or len(embeddings) == 0:
+            raise ValueError("At least one reference embedding is required")
+
+        with self.lock, self.file_lock():
+            # Always start from what's on disk; refuse to write over an index we can't read
+            loaded = self.read_disk()
+            manifest, current = (loaded[0], loaded[1]) if loaded else (dict(EMPTY_MANIFEST), None)
+
+            centroids = np.array(current) if current is not None \
+                else np.zeros((0, embeddings.shape[1]), dtype=np.float32)
+            names = list(manifest['names'])
+            counts = list(manifest['counts'])
+            norms = list(manifest['norms'])
+            if centroids.shape[1] != embeddings.shape[1]:
+                raise ValueError(f"Embedding size {embeddings.shape[1]} does not match index size {centroids.shape[1]}")
+
+            # Keep a running mean of normalized embeddings; the stored centroid is
+            # that mean's direction and `norms` holds its length
+            if name in names:
+                i = names.index(name)
+                total = centroids[i] * norms[i] * counts[i] + embeddings.sum(axis=0)
+                counts[i] += len(embeddings)
+            else:
+                i = len(names)
+                names.append(name)
+                counts.append(len(embeddings))
+                norms.append(0.0)
+                centroids = np.vstack([centroids, np.zeros((1, embeddings.shape[1]), dtype=np.float32)])
+                total = embeddings.sum(axis=0)
+
+            mean = total / counts[i]
+            norms[i] = float(np.linalg.norm(mean))
+            centroids[i] = mean / max(norms[i], 1e-12)
+
+            all_macros = dict(manifest['macros'])
+            if macros:
+                all_macros[name] = macros
+            self.write(centroids, names, counts, norms, all_macros, manifest.get('matrix_file'))
+
+        self.refresh()
+
+    def write(self, centroids, names, counts, norms, macros, previous_matrix=None):
+        """Publish a new matrix + manifest; caller must hold file_lock()"""
+        matrix_file = f"{self.base}.{uuid.uuid4().hex[:12]}.npy"
+        np.save(os.path.join(self.directory, matrix_file), centroids.astype(np.float32))
+
+        manifest = {
+            'matrix_file': matrix_file,
+            'names': names,
+            'counts': counts,
+            'norms': norms,
+            'macros': macros
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=self.base + '.', suffix='.json.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+        # Remove the matrix the old manifest named, plus anything older (left by a
+        # crashed writer). Never touch newer files. Old matrices may still be
+        # mapped by other workers; that's fine on POSIX.
+        if not previous_matrix:
+            return
+        previous_path = os.path.join(self.directory, previous_matrix)
+        try:
+            cutoff = os.stat(previous_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        for entry in os.listdir(self.directory):
+            if not (entry.startswith(self.base + '.') and entry.endswith('.npy')) or entry == matrix_file:
+                continue
+            entry_path = os.path.join(self.directory, entry)
+            try:
+                if os.stat(entry_path).st_mtime_ns <= cutoff:
+                    os.remove(entry_path)
+            except OSError:
+                pass
@@ -1,12 +1,28 @@
 # food_predictor.py
+import inference_tuning
+
+# Tuned CPU settings must be in place before TensorFlow initializes
+INFERENCE_SETTINGS, INFERENCE_PROFILE = inference_tuning.load_profile()
+inference_tuning.apply_env(INFERENCE_SETTINGS)
+
 import tensorflow as tf
 import numpy as np
 from tensorflow.keras.preprocessing import image
 import json
 import os
+import time
+import request_logging
+from embedding_index import EmbeddingIndex, dish_key, prefer_registered_dish
+
+logger = request_logging.get_logger('food_predictor')
+
+# What TensorFlow actually runs with; reported by the health endpoint
+APPLIED_SETTINGS = inference_tuning.apply_tf(INFERENCE_SETTINGS, tf)
 
 print(f"TensorFlow version: {tf.__version__}")
 print(f"Keras version: {tf.keras.__version__}")
+if INFERENCE_PROFILE:
+    print(f"Inference profile: {INFERENCE_PROFILE} {APPLIED_SETTINGS}")
 
 class FoodClassifier:
     def __init__(self, model_path='model.h5', config_path='config.json'):
@@ -65,6 +81,7 @@ class FoodClassifier:
                 config = json.load(f)
             
             self.class_names = config['class_names']
+            self.tensorflow_version = tf.__version__
             self.confidence_threshold = config.get('confidence_threshold', 0.80)
             self.image_size = tuple(config.get('image_size', [224, 224]))
             
@@ -76,6 +93,28 @@ class FoodClassifier:
                     metrics=['accuracy']
                 )
                 print("✓ Model compiled")
+
+            # Same weights, two outputs: the penultimate-layer embedding and the softmax
+            self.inference_model = tf.keras.Model(
+                inputs=self.model.inputs,
+                outputs=[self.model.layers[-1].input, self.model.output]
+            )
+
+            # Dishes registered at runtime from reference images (no retraining)
+            self.dish_index = EmbeddingIndex(config.get('embedding_index', 'dish_index.json'))
+            self.embedding_threshold = config.get('embedding_threshold', 0.85)
+
+            # XLA JIT for Keras' predict function (must be set before the first predict)
+            self.inference_settings = {**APPLIED_SETTINGS, 'profile': INFERENCE_PROFILE}
+            if INFERENCE_SETTINGS.get('xla'):
+                try:
+                    self.model.jit_compile = True
+                    self.inference_model.jit_compile = True
+                except Exception as e:
+                    print(f"Could not enable XLA: {e}")
+                    # Keep global autoclustering consistent with what health reports
+                    tf.config.optimizer.set_jit(False)
+                    self.inference_settings['xla'] = False
             
             # Nutritional information database
             self.macros = {
@@ -108,11 +147,14 @@ class FoodClassifier:
             print(f"✓ Number of classes: {len(self.class_names)}")
             print(f"✓ Classes: {self.class_names}")
             print(f"✓ Confidence threshold: {self.confidence_threshold}")
+            print(f"✓ Registered dishes: {len(self.dish_index)}")
             
-            # Test prediction with dummy data to verify model works
-            test_input = np.random.random((1, 224, 224, 3))
-            test_pred = self.model.predict(test_input, verbose=0)
-            print(f"✓ Model test prediction successful - output shape: {test_pred.shape}")
+            # Test prediction with dummy data on the model that serves requests;
+            # also warms up (and XLA-compiles) its predict function
+            test_input = np.random.random((1, *self.image_size, 3))
+            test_embedding, test_pred = self.inference_model.predict(test_input, verbose=0)
+            print(f"✓ Model test prediction successful - output shape: {test_pred.shape}, "
+                  f"embedding shape: {test_embedding.shape}")
             
         except Exception as e:
             print(f"❌ Error loading model: {str(e)}")
@@ -129,14 +171,61 @@ class FoodClassifier:
         img_array = (img_array / 127.5) - 1
         return img_array
 
+    def macros_for(self, food):
+        """Nutrition info for a trained class or a runtime-registered dish"""
+        if food in self.macros:
+            return self.macros[food]
+        return self.dish_index.macros.get(food, {
+            'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0, 'serving': '1 serving'
+        })
+
+    def embed(self, img_paths):
+        """Penultimate-layer embeddings for a batch of images, shape (n, embedding_size)"""
+        batch = np.concatenate([self.preprocess_image(p) for p in img_paths])
+        embeddings, _ = self.inference_model.predict(batch, verbose=0)
+        return embeddings
+
+    def registered_dishes(self):
+        """Names of dishes added through register_dish()"""
+        self.dish_index.refresh()
+        return list(self.dish_index.names)
+
+    def register_dish(self, name, img_paths, macros=None):
+        """Add (or extend) a dish from a few example images"""
+        try:
+            name = dish_key(name)
+            if not name:
+                return {'status': 'error', 'error': 'Dish name is required'}
+            if name in self.class_names:
+                return {'status': 'error', 'error': f"'{name}' is already a trained class"}
+            if not img_paths:
+                return {'status': 'error', 'error': 'At least one reference image is required'}
+
+            self.dish_index.add(name, self.embed(img_paths), macros)
+            logger.info('dish registered', extra={'food': name, 'images': len(img_paths)})
+            return {
+                'status': 'registered',
+                'food': name,
+                'images': len(img_paths),
+                'registered_dishes': len(self.dish_index)
+            }
+
+        except Exception as e:
+            logger.exception('dish registration failed')
+            return {
+                'status': 'error',
+                'error': f'Registration failed: {str(e)}'
+            }
+
     def predict(self, img_path):
         """Predict food from image"""
+        start = time.perf_counter()
         try:
             # Preprocess
             img_array = self.preprocess_image(img_path)
 
             # Predict
-            predictions = self.model.predict(img_array, verbose=0)
+            embeddings, predictions = self.inference_model.predict(img_array, verbose=0)
 
             # Get top prediction
             predicted_idx = np.argmax(predictions[0])
@@ -153,15 +242,27 @@ class FoodClassifier:
                 for idx in top_3_idx
             ]
 
+            # A registered dish only wins when the trained head didn't recognize the image
+            matches = self.dish_index.lookup(embeddings)[0]
+            if prefer_registered_dish(matches[0] if matches else None, confidence,
+                                      self.confidence_threshold, self.embedding_threshold):
+                predicted_class, confidence = matches[0]
+                result = {
+                    'status': 'recognized',
+                    'food': predicted_class,
+                    'confidence': round(confidence * 100, 1),
+                    'macros': self.macros_for(predicted_class),
+                    'top_3': [{'name': n, 'confidence': c} for n, c in matches],
+                    'source': 'embedding_index'
+                }
+
             # Check confidence threshold
-            if confidence >= self.confidence_threshold:
+            elif confidence >= self.confidence_threshold:
                 result = {
                     'status': 'recognized',
                     'food': predicted_class,
                     'confidence': round(confidence * 100, 1),
-                    'macros': self.macros.get(predicted_class, {
-                        'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0, 'serving': '1 serving'
-                    }),
+                    'macros': self.macros_for(predicted_class),
                     'top_3': top_3
                 }
             else:
@@ -174,9 +275,15 @@ class FoodClassifier:
                     'top_3': top_3
                 }
 
+            logger.debug('food prediction', extra={
+                'food': predicted_class,
+                'confidence': round(confidence, 4),
+                'duration_ms': round((time.perf_counter() - start) * 1000, 2)
+            })
             return result
 
         except Exception as e:
+            logger.exception('food prediction failed')
             return {
                 'status': 'error',
                 'error': f'Prediction failed: {str(e)}'
@@ -0,0 +1,214 @@
+# inference_client.py
+"""
+Pooled keep-alive client for the standalone inference server.
+
+RemoteFoodClassifier mirrors the parts of FoodClassifier used by app.py
+(predict() and class_names), so the web tier can swap it in without
+importing TensorFlow.
+"""
+
+from urllib.parse import urlparse
+import http.client
+import json
+import queue
+import socket
+
+from inference_server import encode_dish_request
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class ConnectionPool:
+    """Keeps idle keep-alive connections around for reuse"""
+
+    def __init__(self, url, max_idle=8, connect_timeout=2.0, read_timeout=30.0):
+        parsed = urlparse(url)
+        if parsed.scheme == 'unix':
+            self.socket_path = parsed.path
+            self.host, self.port = None, None
+        elif parsed.scheme == 'http':
+            self.socket_path = None
+            self.host, self.port = parsed.hostname, parsed.port or 80
+        else:
+            raise ValueError(f"Unsupported inference server URL: {url}")
+
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.idle = queue.LifoQueue(maxsize=max_idle)
+
+    def new_connection(self):
+        if self.socket_path:
+            conn = UnixHTTPConnection(self.socket_path, timeout=self.connect_timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+        conn.connect()
+        # Connect fast, but give the model time to answer
+        conn.sock.settimeout(self.read_timeout)
+        return conn
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait(), True
+        except queue.Empty:
+            return self.new_connection(), False
+
+    def release(self, conn):
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request and return (status, parsed JSON body)"""
+        conn, reused = self.acquire()
+        try:
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+            except (http.client.HTTPException, ConnectionError, BrokenPipeError):
+                # A pooled connection may have been closed by the server; retry once fresh
+                conn.close()
+                if not reused:
+                    raise
+                conn = self.new_connection()
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self.release(conn)
+        return response.status, json.loads(data.decode('utf-8'))
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class RemoteFoodClassifier:
+    def __init__(self, url, max_idle=8, connect_timeout=2.0, read_timeout=30.0):
+        """Client for an inference server, e.g. http://127.0.0.1:8500 or unix:///tmp/x.sock
+
+        Doesn't contact the server: the model tier may still be loading when the
+        web tier starts, so server info is fetched lazily and retried on each use
+        until it succeeds.
+        """
+        self.url = url
+        self.pool = ConnectionPool(url, max_idle, connect_timeout, read_timeout)
+        self.info = None
+
+    def server_info(self):
+        """Cached /health info, or None if the server hasn't answered yet"""
+        if self.info is None:
+            try:
+                self.info = self.health()
+                print(f"✓ Connected to inference server at {self.url} "
+                      f"({len(self.info['class_names'])} classes)")
+            except Exception:
+                return None
+        return self.info
+
+    def connected(self):
+        return self.server_info() is not None
+
+    @property
+    def class_names(self):
+        info = self.server_info()
+        return info['class_names'] if info else []
+
+    @property
+    def confidence_threshold(self):
+        info = self.server_info()
+        return info.get('confidence_threshold', 0.80) if info else 0.80
+
+    @property
+    def tensorflow_version(self):
+        info = self.server_info()
+        return info.get('tensorflow_version', 'Unknown') if info else 'Unknown'
+
+    @property
+    def inference_settings(self):
+        info = self.server_info()
+        return info.get('inference_settings') if info else None
+
+    def health(self):
+        """Fetch model status from the inference server"""
+        status, payload = self.pool.request('GET', '/health')
+        if status != 200:
+            raise RuntimeError(f"Inference server unhealthy: {payload.get('error', status)}")
+        return payload
+
+    def registered_dishes(self):
+        """Names of dishes registered on the inference server"""
+        try:
+            return self.health().get('registered_dishes', [])
+        except Exception:
+            return []
+
+    def register_dish(self, name, img_paths, macros=None):
+        """Add (or extend) a dish on the inference server from a few example images"""
+        try:
+            images = []
+            for img_path in img_paths:
+                with open(img_path, 'rb') as f:
+                    images.append(f.read())
+
+            body = encode_dish_request(name, macros, images)
+            status, result = self.pool.request('POST', '/dishes', body=body, headers={
+                'Content-Type': 'application/octet-stream',
+                'Content-Length': str(len(body))
+            })
+            return self.check_status(status, result)
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': f'Registration failed: {str(e)}'
+            }
+
+    @staticmethod
+    def check_status(status, result):
+        """Pass server errors through, keeping the HTTP status for the web tier"""
+        if status == 200:
+            return result
+        if result.get('status') != 'error':
+            result = {'status': 'error', 'error': f'Inference server returned {status}'}
+        return {**result, 'http_status': status}
+
+    def predict(self, img_path):
+        """Predict food from image via the inference server"""
+        try:
+            with open(img_path, 'rb') as f:
+                data = f.read()
+
+            status, result = self.pool.request('POST', '/predict', body=data, headers={
+                'Content-Type': 'application/octet-stream',
+                'Content-Length': str(len(data))
+            })
+            return self.check_status(status, result)
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'error': f'Prediction failed: {str(e)}'
+            }
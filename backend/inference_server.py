@@ -0,0 +1,211 @@
+# inference_server.py
+"""
+Standalone inference server for MacroMate.
+
+Owns the only FoodClassifier (and TensorFlow) instance so the Flask web tier
+can run without loading the model in every worker. Speaks plain HTTP/1.1 with
+keep-alive over localhost TCP or a Unix socket:
+
+  POST /predict   raw image bytes in the body -> prediction JSON
+  POST /dishes    length-prefixed JSON header + raw image bytes -> registration JSON
+                  (see encode_dish_request)
+  GET  /health    model status, class names and TensorFlow version
+
+Run with:
+  python inference_server.py --host 127.0.0.1 --port 8500
+  python inference_server.py --socket /tmp/macromate-inference.sock
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+import argparse
+import json
+import os
+import struct
+import tempfile
+import threading
+
+# Images are sent raw, so the web tier's 16MB upload limit fits; the headroom
+# covers the small JSON header on /dishes requests
+MAX_REQUEST_SIZE = 16 * 1024 * 1024 + 64 * 1024
+
+
+def encode_dish_request(name, macros, images):
+    """/dishes body: 4-byte big-endian header length, JSON header, then the images back to back"""
+    header = json.dumps({'name': name, 'macros': macros, 'sizes': [len(img) for img in images]}).encode('utf-8')
+    return struct.pack('>I', len(header)) + header + b''.join(images)
+
+
+def decode_dish_request(data):
+    """Inverse of encode_dish_request: returns (header dict, list of image bytes)"""
+    (header_len,) = struct.unpack('>I', data[:4])
+    payload = json.loads(data[4:4 + header_len].decode('utf-8'))
+    images, offset = [], 4 + header_len
+    for size in payload.get('sizes', []):
+        images.append(data[offset:offset + size])
+        offset += size
+    if offset != len(data):
+        raise ValueError('image sizes do not match request body')
+    return payload, images
+
+
+def spool_images(images):
+    """FoodClassifier works on file paths, so write image bytes to temp files"""
+    filepaths = []
+    for data in images:
+        fd, filepath = tempfile.mkstemp(prefix='macromate-', suffix='.img')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        filepaths.append(filepath)
+    return filepaths
+
+
+def remove_files(filepaths):
+    for filepath in filepaths:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """Handles /predict and /health requests against the shared classifier"""
+
+    protocol_version = 'HTTP/1.1'  # keep connections open for pooled clients
+    timeout = 60  # close keep-alive connections idle this long (clients reconnect)
+    server_version = 'MacroMateInference/1.0'
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self.send_json(404, {'status': 'error', 'error': 'Not found'})
+            return
+
+        classifier = self.server.classifier
+        self.send_json(200, {
+            'status': 'ok',
+            'model_loaded': True,
+            'class_names': classifier.class_names,
+            'confidence_threshold': classifier.confidence_threshold,
+            'tensorflow_version': classifier.tensorflow_version,
+            'inference_settings': classifier.inference_settings,
+            'registered_dishes': classifier.registered_dishes()
+        })
+
+    def do_POST(self):
+        if self.path not in ('/predict', '/dishes'):
+            self.send_json(404, {'status': 'error', 'error': 'Not found'})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            self.send_json(400, {'status': 'error', 'error': 'Empty request body'})
+            return
+        if length > MAX_REQUEST_SIZE:
+            self.send_json(413, {'status': 'error', 'error': 'Request too large'})
+            self.close_connection = True
+            return
+
+        data = self.rfile.read(length)
+        if self.path == '/predict':
+            self.handle_predict(data)
+        else:
+            self.handle_register(data)
+
+    def handle_predict(self, data):
+        filepaths = spool_images([data])
+        try:
+            with self.server.predict_lock:
+                result = self.server.classifier.predict(filepaths[0])
+        finally:
+            remove_files(filepaths)
+
+        self.send_json(200, result)
+
+    def handle_register(self, data):
+        try:
+            payload, images = decode_dish_request(data)
+        except (ValueError, TypeError, struct.error) as e:
+            self.send_json(400, {'status': 'error', 'error': f'Invalid registration request: {e}'})
+            return
+
+        filepaths = spool_images(images)
+        try:
+            with self.server.predict_lock:
+                result = self.server.classifier.register_dish(
+                    payload.get('name', ''), filepaths, payload.get('macros'))
+        finally:
+            remove_files(filepaths)
+
+        self.send_json(200, result)
+
+    def log_message(self, format, *args):
+        # Per-request access logs are too noisy for the hot path
+        pass
+
+
+class TCPInferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class UnixInferenceServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) style client address
+        return request, ('unix', 0)
+
+
+def create_server(classifier, host='127.0.0.1', port=8500, socket_path=None):
+    """Create an inference server bound to a TCP port or a Unix socket"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixInferenceServer(socket_path, InferenceRequestHandler)
+    else:
+        server = TCPInferenceServer((host, port), InferenceRequestHandler)
+
+    server.classifier = classifier
+    # Keras predict is not guaranteed thread-safe; serialize model calls
+    server.predict_lock = threading.Lock()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MacroMate food inference server')
+    parser.add_argument('--host', default=os.environ.get('INFERENCE_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('INFERENCE_PORT', 8500)))
+    parser.add_argument('--socket', default=os.environ.get('INFERENCE_SOCKET'),
+                        help='Unix socket path (overrides --host/--port)')
+    parser.add_argument('--model', default='model.h5')
+    parser.add_argument('--config', default='config.json')
+    args = parser.parse_args()
+
+    from food_predictor import FoodClassifier
+    import request_logging
+
+    request_logging.configure_logging()
+    print("Initializing food classifier...")
+    classifier = FoodClassifier(model_path=args.model, config_path=args.config)
+    server = create_server(classifier, args.host, args.port, args.socket)
+
+    where = args.socket if args.socket else f"{args.host}:{args.port}"
+    print(f"✓ Inference server listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+# inference_tuning.py
+"""
+CPU inference autotuner for FoodClassifier.
+
+Benchmarks TensorFlow thread pool sizes, oneDNN and XLA JIT on the current
+host and writes the fastest configuration to a profile file. food_predictor.py
+applies the profile automatically at startup.
+
+Run with:
+  python inference_tuning.py --autotune
+  python inference_tuning.py --autotune --threads 1,2,4 --batch-sizes 1,8 --no-onednn-sweep
+
+Thread pools and oneDNN can only be configured before TensorFlow starts, so
+every candidate is benchmarked in a fresh subprocess.
+"""
+
+from datetime import datetime
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILE_PATH = os.environ.get('INFERENCE_PROFILE', 'inference_profile.json')
+RESULT_MARKER = 'AUTOTUNE_RESULT '
+
+DEFAULT_SETTINGS = {
+    'intra_op_threads': 0,  # 0 = let TensorFlow decide
+    'inter_op_threads': 0,
+    'onednn': None,         # None = TensorFlow default
+    'xla': False
+}
+
+
+def available_cpus():
+    """CPUs this process may run on (respects container CPU affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def load_profile(path=None):
+    """Load tuned settings, falling back to TensorFlow defaults"""
+    path = path or PROFILE_PATH
+    settings = dict(DEFAULT_SETTINGS)
+    if not os.path.exists(path):
+        return settings, None
+
+    try:
+        with open(path, 'r') as f:
+            profile = json.load(f)
+        settings.update(profile.get('settings', {}))
+        return settings, path
+    except Exception as e:
+        print(f"Could not read inference profile {path}: {e}")
+        return dict(DEFAULT_SETTINGS), None
+
+
+def apply_env(settings):
+    """Apply settings that TensorFlow only reads at import time"""
+    if settings.get('onednn') is not None:
+        os.environ['TF_ENABLE_ONEDNN_OPTS'] = '1' if settings['onednn'] else '0'
+    if settings.get('intra_op_threads'):
+        # oneDNN kernels use OpenMP threads rather than TF's intra-op pool; a tuned
+        # profile wins over whatever the container set
+        os.environ['OMP_NUM_THREADS'] = str(settings['intra_op_threads'])
+
+
+def apply_tf(settings, tf):
+    """Apply thread pool and XLA settings; must run before the first TF op.
+
+    Returns the settings TensorFlow actually ended up with, which can differ
+    from the profile if TensorFlow was already initialized.
+    """
+    try:
+        if settings.get('intra_op_threads'):
+            tf.config.threading.set_intra_op_parallelism_threads(settings['intra_op_threads'])
+        if settings.get('inter_op_threads'):
+            tf.config.threading.set_inter_op_parallelism_threads(settings['inter_op_threads'])
+    except RuntimeError as e:
+        # TensorFlow was already initialized by someone else
+        print(f"Could not apply thread settings: {e}")
+    tf.config.optimizer.set_jit(bool(settings.get('xla')))
+
+    onednn = os.environ.get('TF_ENABLE_ONEDNN_OPTS')
+    return {
+        'intra_op_threads': tf.config.threading.get_intra_op_parallelism_threads(),
+        'inter_op_threads': tf.config.threading.get_inter_op_parallelism_threads(),
+        'omp_num_threads': int(os.environ['OMP_NUM_THREADS']) if os.environ.get('OMP_NUM_THREADS') else None,
+        'onednn': None if onednn is None else onednn == '1',
+        'xla': bool(tf.config.optimizer.get_jit())
+    }
+
+
+def candidate_settings(threads, inter_threads, onednn_options, xla_options):
+    for intra, inter, onednn, xla in itertools.product(threads, inter_threads, onednn_options, xla_options):
+        yield {
+            'intra_op_threads': intra,
+            'inter_op_threads': inter,
+            'onednn': onednn,
+            'xla': xla
+        }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def benchmark_current_process(batch_sizes, iterations, warmup, model_path, config_path):
+    """Benchmark FoodClassifier with whatever profile this process started with"""
+    import numpy as np
+    from food_predictor import FoodClassifier
+
+    classifier = FoodClassifier(model_path=model_path, config_path=config_path)
+    height, width = classifier.image_size
+
+    results = {}
+    for batch_size in batch_sizes:
+        batch = np.random.uniform(-1, 1, (batch_size, height, width, 3)).astype('float32')
+        for _ in range(warmup):
+            classifier.inference_model.predict(batch, verbose=0)
+
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            classifier.inference_model.predict(batch, verbose=0)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        results[str(batch_size)] = {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'images_per_sec': round(batch_size * 1000 / (sum(timings) / len(timings)), 1)
+        }
+    return results
+
+
+def run_candidate(settings, args):
+    """Benchmark one candidate in a fresh interpreter and return its results"""
+    fd, profile_path = tempfile.mkstemp(prefix='macromate-profile-', suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'settings': settings}, f)
+
+    env = dict(os.environ, INFERENCE_PROFILE=profile_path)
+    env.pop('OMP_NUM_THREADS', None)
+    cmd = [
+        sys.executable, os.path.abspath(__file__), '--benchmark',
+        '--batch-sizes', ','.join(str(b) for b in args.batch_sizes),
+        '--iterations', str(args.iterations),
+        '--warmup', str(args.warmup),
+        '--model', args.model,
+        '--config', args.config
+    ]
+    try:
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=args.timeout)
+    except subprocess.TimeoutExpired:
+        print(f"  timed out: {settings}")
+        return None
+    finally:
+        os.remove(profile_path)
+
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+
+    print(f"  failed: {settings}")
+    print(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else '  (no output)')
+    return None
+
+
+def autotune(args):
+    """Benchmark every candidate and write the best one to the profile file"""
+    cpus = available_cpus()
+    threads = args.threads or sorted({t for t in (1, 2, 4, 8, 16) if t <= cpus} | {cpus})
+    onednn_options = [True, False] if args.onednn_sweep else [None]
+    xla_options = [False, True] if args.xla_sweep else [False]
+
+    candidates = list(candidate_settings(threads, args.inter_threads, onednn_options, xla_options))
+    print(f"Autotuning {len(candidates)} configurations on {cpus} CPUs...")
+
+    # Score on tail latency at the serving batch size (one image per request)
+    score_batch = str(min(args.batch_sizes))
+    benchmarks = []
+    for settings in candidates:
+        results = run_candidate(settings, args)
+        if results is None:
+            continue
+        benchmarks.append({'settings': settings, **results})
+        print(f"  {settings} -> p95 {results['results'][score_batch]['p95_ms']} ms @ batch {score_batch}")
+
+    if not benchmarks:
+        print("❌ No configuration could be benchmarked")
+        return None
+
+    best = min(benchmarks, key=lambda b: (b['results'][score_batch]['p95_ms'],
+                                          b['results'][score_batch]['p50_ms']))
+
+    profile = {
+        'settings': best['settings'],
+        'score': {'batch_size': int(score_batch), **best['results'][score_batch]},
+        'host': {'cpus': cpus, 'tensorflow_version': best['tensorflow_version']},
+        'tuned_at': datetime.now().isoformat(),
+        'benchmarks': benchmarks
+    }
+    with open(args.output, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+    print(f"✓ Best configuration: {best['settings']}")
+    print(f"✓ Profile written to {args.output}")
+    return profile
+
+
+def parse_ints(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MacroMate CPU inference autotuner')
+    parser.add_argument('--autotune', action='store_true', help='benchmark candidates and write the profile')
+    parser.add_argument('--benchmark', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--threads', type=parse_ints, help='intra-op thread counts to try (default: powers of two up to CPU count)')
+    parser.add_argument('--inter-threads', type=parse_ints, default=[1, 2])
+    parser.add_argument('--batch-sizes', type=parse_ints, default=[1, 4, 8])
+    parser.add_argument('--no-onednn-sweep', dest='onednn_sweep', action='store_false')
+    parser.add_argument('--no-xla-sweep', dest='xla_sweep', action='store_false')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--timeout', type=int, default=600, help='seconds per candidate')
+    parser.add_argument('--model', default='model.h5')
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--output', default=PROFILE_PATH)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        results = benchmark_current_process(args.batch_sizes, args.iterations, args.warmup,
+                                            args.model, args.config)
+        import tensorflow as tf
+        print(RESULT_MARKER + json.dumps({'results': results, 'tensorflow_version': tf.__version__}))
+    elif args.autotune:
+        if autotune(args) is None:
+            sys.exit(1)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+# request_logging.py
+"""
+Non-blocking structured logging for MacroMate.
+
+Records are pushed onto a bounded in-memory queue on the request thread and
+written as JSON lines by a background listener thread, so a slow or blocked
+stdout never stalls request handling. When the queue is full new records are
+dropped (and counted) instead of blocking.
+
+Environment:
+  LOG_LEVEL                 minimum level (default INFO)
+  LOG_QUEUE_SIZE            max buffered records (default 10000)
+  LOG_SAMPLE_RATES          per-route sampling, e.g. "/api/calculate/bmi=0.1,/api/predict/food=1"
+  LOG_DEFAULT_SAMPLE_RATE   sampling for routes not listed (default 1.0)
+
+Sampling only thins INFO/DEBUG records; warnings and errors are always kept.
+"""
+
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+request_id_var = ContextVar('request_id', default=None)
+sampled_var = ContextVar('sampled', default=True)
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+_configure_lock = threading.Lock()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.pending_drops = 0
+        self.drops_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Only merge args into the message here; JSON and traceback formatting
+        # happen on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        # Drops are reported on the next record that makes it through; claim
+        # them under the lock so concurrent request threads don't lose counts
+        with self.drops_lock:
+            dropped, self.pending_drops = self.pending_drops, 0
+        if dropped:
+            record.dropped_logs = dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.drops_lock:
+                self.pending_drops += dropped + 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of raising"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel, timeout=5)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attaches the request ID and applies per-route sampling"""
+
+    def filter(self, record):
+        request_id = request_id_var.get()
+        if request_id:
+            record.request_id = request_id
+        return record.levelno >= logging.WARNING or sampled_var.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and extra fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = ''.join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, default=str)
+
+
+def parse_sample_rates(value):
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            route, rate = item.rsplit('=', 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+SAMPLE_RATES = parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES'))
+DEFAULT_SAMPLE_RATE = float(os.environ.get('LOG_DEFAULT_SAMPLE_RATE', 1.0))
+
+
+def configure_logging(level=None, queue_size=None, stream=None):
+    """Route all 'macromate' loggers through the background queue (idempotent)"""
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener:
+            return _queue_handler
+
+        level = level or os.environ.get('LOG_LEVEL', 'INFO').upper()
+        queue_size = queue_size or int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JsonFormatter())
+
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        _queue_handler.addFilter(RequestContextFilter())
+
+        logger = logging.getLogger('macromate')
+        logger.setLevel(level)
+        logger.addHandler(_queue_handler)
+        logger.propagate = False
+
+        _listener = DrainingQueueListener(_queue_handler.queue, output)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _queue_handler
+
+
+def shutdown_logging():
+    """Flush buffered records and stop the listener thread"""
+    global _listener
+    if _listener:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass  # output is wedged; don't hang the process on exit
+        _listener = None
+
+
+def get_logger(name):
+    return logging.getLogger(f'macromate.{name}')
+
+
+def init_app(app):
+    """Add request IDs, sampling and timed access logs to a Flask app"""
+    from flask import g, request
+
+    configure_logging()
+    access_logger = get_logger('access')
+
+    @app.before_request
+    def start_request_logging():
+        g.request_start = time.perf_counter()
+        g.request_id = (request.headers.get('X-Request-ID') or uuid.uuid4().hex)[:64]
+        route = request.url_rule.rule if request.url_rule else request.path
+        rate = SAMPLE_RATES.get(route, DEFAULT_SAMPLE_RATE)
+        request_id_var.set(g.request_id)
+        sampled_var.set(rate >= 1.0 or random.random() < rate)
+
+    @app.after_request
+    def log_request(response):
+        start = g.get('request_start')
+        if start is not None:
+            access_logger.info('request', extra={
+                'method': request.method,
+                'route': request.url_rule.rule if request.url_rule else request.path,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 2)
+            })
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    @app.teardown_request
+    def end_request_logging(exc):
+        # Worker threads are reused; don't leak this request's context
+        request_id_var.set(None)
+        sampled_var.set(True)
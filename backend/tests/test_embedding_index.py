@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import embedding_index
+from embedding_index import EmbeddingIndex, prefer_registered_dish
+
+
+def reference(seed, n=3, size=16):
+    rng = np.random.default_rng(seed)
+    center = rng.random(size)
+    return center + 0.05 * rng.random((n, size))
+
+
+def test_lookup_finds_registered_dish(tmp_path):
+    index = EmbeddingIndex(str(tmp_path / 'dish_index.json'))
+    index.add('neer_dosa', reference(1), {'calories': 120})
+    index.add('ragi_mudde', reference(2))
+
+    matches = index.lookup(reference(1, n=1))[0]
+    assert matches[0][0] == 'neer_dosa'
+    assert index.macros['neer_dosa'] == {'calories': 120}
+
+
+def test_other_worker_sees_update(tmp_path):
+    path = str(tmp_path / 'dish_index.json')
+    first, second = EmbeddingIndex(path), EmbeddingIndex(path)
+    first.add('neer_dosa', reference(1))
+    second.add('ragi_mudde', reference(2))
+
+    assert first.lookup(reference(2, n=1))[0][0][0] == 'ragi_mudde'
+    assert sorted(first.names) == ['neer_dosa', 'ragi_mudde']
+
+
+def test_update_with_same_mtime_is_seen(tmp_path):
+    path = str(tmp_path / 'dish_index.json')
+    first, second = EmbeddingIndex(path), EmbeddingIndex(path)
+    first.add('neer_dosa', reference(1))
+    seen = os.stat(path)
+
+    # A publish within the same clock tick leaves the mtime unchanged
+    second.add('ragi_mudde', reference(2))
+    os.utime(path, ns=(seen.st_atime_ns, seen.st_mtime_ns))
+
+    assert first.lookup(reference(2, n=1))[0][0][0] == 'ragi_mudde'
+
+
+@pytest.mark.skipif(embedding_index.fcntl is None, reason='needs fcntl')
+def test_concurrent_writers_keep_every_dish(tmp_path, monkeypatch):
+    path = str(tmp_path / 'dish_index.json')
+    EmbeddingIndex(path).add('a_dish', reference(1))
+
+    # Pause writer B just before it publishes its manifest
+    paused, resume = threading.Event(), threading.Event()
+    real_write = EmbeddingIndex.write
+
+    def slow_write(self, *args, **kwargs):
+        if threading.current_thread().name == 'writer-b':
+            paused.set()
+            resume.wait(5)
+        return real_write(self, *args, **kwargs)
+
+    monkeypatch.setattr(EmbeddingIndex, 'write', slow_write)
+
+    writer_b = threading.Thread(name='writer-b',
+                                target=lambda: EmbeddingIndex(path).add('b_dish', reference(2)))
+    writer_b.start()
+    assert paused.wait(5)
+
+    writer_a = threading.Thread(target=lambda: EmbeddingIndex(path).add('c_dish', reference(3)))
+    writer_a.start()
+    writer_a.join(0.3)
+    assert writer_a.is_alive()  # blocked on the lock instead of racing B
+
+    resume.set()
+    writer_b.join(5)
+    writer_a.join(5)
+
+    with open(path) as f:
+        manifest = json.load(f)
+    assert os.path.exists(tmp_path / manifest['matrix_file'])
+    assert sorted(EmbeddingIndex(path).names) == ['a_dish', 'b_dish', 'c_dish']
+    assert len(list(tmp_path.glob('dish_index.*.npy'))) == 1
+
+
+def test_missing_matrix_is_logged_and_blocks_writes(tmp_path, caplog):
+    path = str(tmp_path / 'dish_index.json')
+    EmbeddingIndex(path).add('a_dish', reference(1))
+    with open(path) as f:
+        os.remove(tmp_path / json.load(f)['matrix_file'])
+
+    with caplog.at_level(logging.ERROR, logger='macromate.embedding_index'):
+        index = EmbeddingIndex(path)
+    assert len(index) == 0
+    assert 'dish index unreadable' in caplog.text
+
+    with pytest.raises(RuntimeError):
+        index.add('b_dish', reference(2))
+    with open(path) as f:
+        assert json.load(f)['names'] == ['a_dish']
+
+
+def test_confident_trained_class_beats_registered_dish():
+    # Identical embedding to a registered dish, but the softmax head is sure
+    assert not prefer_registered_dish(('ragi_mudde', 1.0), 0.99, 0.80, 0.85)
+
+
+def test_registered_dish_used_when_softmax_is_unsure():
+    assert prefer_registered_dish(('ragi_mudde', 0.95), 0.40, 0.80, 0.85)
+    assert not prefer_registered_dish(('ragi_mudde', 0.70), 0.40, 0.80, 0.85)
+    assert not prefer_registered_dish(None, 0.40, 0.80, 0.85)
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+Image = pytest.importorskip('PIL.Image')
+
+
+@pytest.fixture
+def classifier(tmp_path):
+    """Tiny 2-class model: embedding = relu(mean RGB), class 0 = red, class 1 = blue"""
+    from food_predictor import FoodClassifier
+
+    inputs = tf.keras.Input(shape=(None, None, 3))
+    x = tf.keras.layers.GlobalAveragePooling2D()(inputs)
+    x = tf.keras.layers.Dense(3, activation='relu')(x)
+    outputs = tf.keras.layers.Dense(2, activation='softmax')(x)
+    model = tf.keras.Model(inputs, outputs)
+    model.layers[2].set_weights([np.eye(3, dtype='float32'), np.zeros(3, dtype='float32')])
+    model.layers[3].set_weights([
+        np.array([[20, 0], [0, 0], [0, 20]], dtype='float32'),
+        np.zeros(2, dtype='float32')
+    ])
+    model_path = str(tmp_path / 'model.h5')
+    model.save(model_path)
+
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({
+        'class_names': ['red_curry', 'blue_rice'],
+        'image_size': [8, 8],
+        'embedding_index': str(tmp_path / 'dish_index.json')
+    }))
+    return FoodClassifier(model_path=model_path, config_path=str(config_path))
+
+
+def solid_image(tmp_path, name, rgb):
+    path = str(tmp_path / f'{name}.png')
+    Image.new('RGB', (8, 8), rgb).save(path)
+    return path
+
+
+def test_confident_trained_class_survives_registration(classifier, tmp_path):
+    red = solid_image(tmp_path, 'red', (255, 0, 0))
+    # Register a dish whose reference images embed exactly like the trained class
+    assert classifier.register_dish('ragi mudde', [red, red])['status'] == 'registered'
+
+    result = classifier.predict(red)
+    assert result['status'] == 'recognized'
+    assert result['food'] == 'red_curry'
+    assert 'source' not in result
+
+
+def test_registered_dish_recognized_when_softmax_unsure(classifier, tmp_path):
+    green = solid_image(tmp_path, 'green', (0, 255, 0))
+    classifier.register_dish('neer dosa', [green], {'calories': 120})
+
+    result = classifier.predict(green)
+    assert result['food'] == 'neer_dosa'
+    assert result['source'] == 'embedding_index'
+    assert result['macros'] == {'calories': 120}
+
+
+def test_trained_class_name_rejected(classifier, tmp_path):
+    red = solid_image(tmp_path, 'red', (255, 0, 0))
+    result = classifier.register_dish('Red Curry', [red])
+    assert result['status'] == 'error'
+    assert len(classifier.dish_index) == 0
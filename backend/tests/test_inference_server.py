@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+import inference_server
+from inference_client import RemoteFoodClassifier
+
+
+class StubClassifier:
+    class_names = ['idli', 'vada']
+    confidence_threshold = 0.8
+    inference_settings = {'intra_op_threads': 1}
+    tensorflow_version = 'stub'
+
+    def __init__(self):
+        self.calls = 0
+
+    def registered_dishes(self):
+        return []
+
+    def register_dish(self, name, img_paths, macros=None):
+        sizes = []
+        for img_path in img_paths:
+            with open(img_path, 'rb') as f:
+                sizes.append(len(f.read()))
+        return {'status': 'registered', 'dish': name, 'sizes': sizes, 'macros': macros}
+
+    def predict(self, img_path):
+        self.calls += 1
+        with open(img_path, 'rb') as f:
+            size = len(f.read())
+        return {'status': 'recognized', 'food': 'idli', 'size': size}
+
+
+@pytest.fixture(params=['tcp', 'unix'])
+def served(request, tmp_path):
+    """(client, stub classifier) talking to a live inference server"""
+    classifier = StubClassifier()
+    if request.param == 'tcp':
+        server = inference_server.create_server(classifier, port=0)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    else:
+        socket_path = str(tmp_path / 'inference.sock')
+        server = inference_server.create_server(classifier, socket_path=socket_path)
+        url = f"unix://{socket_path}"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = RemoteFoodClassifier(url)
+    yield client, classifier
+    client.pool.close()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / 'food.jpg'
+    path.write_bytes(b'x' * 1000)
+    return str(path)
+
+
+def test_predict_round_trip(served, image):
+    client, classifier = served
+    assert client.predict(image) == {'status': 'recognized', 'food': 'idli', 'size': 1000}
+    assert client.class_names == ['idli', 'vada']
+    assert client.inference_settings == {'intra_op_threads': 1}
+
+
+def test_pooled_connection_is_reused(served, image):
+    client, _ = served
+    client.predict(image)
+    conn = client.pool.idle.queue[0]
+    client.predict(image)
+    client.predict(image)
+    assert client.pool.idle.qsize() == 1
+    assert client.pool.idle.queue[0] is conn
+
+
+def test_retries_when_server_closed_pooled_connection(served, image, monkeypatch):
+    client, classifier = served
+    monkeypatch.setattr(inference_server.InferenceRequestHandler, 'timeout', 0.2)
+    client.pool.close()
+
+    client.predict(image)
+    time.sleep(0.5)  # server drops the idle keep-alive connection
+    assert client.predict(image)['status'] == 'recognized'
+    assert classifier.calls == 2
+
+
+def test_empty_body_rejected(served):
+    client, _ = served
+    status, payload = client.pool.request('POST', '/predict', body=b'',
+                                          headers={'Content-Length': '0'})
+    assert status == 400
+    assert payload['status'] == 'error'
+
+
+def test_oversized_body_rejected(served, monkeypatch):
+    client, classifier = served
+    monkeypatch.setattr(inference_server, 'MAX_REQUEST_SIZE', 10)
+    status, payload = client.pool.request('POST', '/predict', body=b'x' * 100,
+                                          headers={'Content-Length': '100'})
+    assert status == 413
+    assert classifier.calls == 0
+
+
+def test_register_dish_sends_raw_images(served, tmp_path, image):
+    client, _ = served
+    small = tmp_path / 'small.jpg'
+    small.write_bytes(b'\x00\xff' * 10)
+    result = client.register_dish('neer_dosa', [image, str(small)], {'calories': 120})
+    assert result == {'status': 'registered', 'dish': 'neer_dosa', 'sizes': [1000, 20],
+                      'macros': {'calories': 120}}
+
+
+def test_register_dish_too_large_keeps_413(served, image, monkeypatch):
+    client, _ = served
+    monkeypatch.setattr(inference_server, 'MAX_REQUEST_SIZE', 100)
+    result = client.register_dish('neer_dosa', [image])
+    assert result['status'] == 'error'
+    assert result['http_status'] == 413
+
+
+def test_client_starts_before_server(tmp_path, image):
+    socket_path = str(tmp_path / 'late.sock')
+    client = RemoteFoodClassifier(f"unix://{socket_path}")
+    assert not client.connected()
+    assert client.class_names == []
+    assert client.predict(image)['status'] == 'error'
+
+    server = inference_server.create_server(StubClassifier(), socket_path=socket_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert client.connected()
+        assert client.class_names == ['idli', 'vada']
+        assert client.predict(image)['status'] == 'recognized'
+    finally:
+        client.pool.close()
+        server.shutdown()
+        server.server_close()
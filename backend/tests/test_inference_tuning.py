@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+
+import inference_tuning
+
+
+def test_load_profile_missing_uses_defaults(tmp_path):
+    settings, path = inference_tuning.load_profile(str(tmp_path / 'none.json'))
+    assert settings == inference_tuning.DEFAULT_SETTINGS
+    assert path is None
+
+
+def test_load_profile_merges_settings(tmp_path):
+    profile = tmp_path / 'profile.json'
+    profile.write_text(json.dumps({'settings': {'intra_op_threads': 2, 'xla': True}}))
+    settings, path = inference_tuning.load_profile(str(profile))
+    assert settings['intra_op_threads'] == 2
+    assert settings['xla'] is True
+    assert settings['inter_op_threads'] == 0
+    assert path == str(profile)
+
+
+def test_load_profile_corrupt_falls_back(tmp_path):
+    profile = tmp_path / 'profile.json'
+    profile.write_text('{not json')
+    settings, path = inference_tuning.load_profile(str(profile))
+    assert settings == inference_tuning.DEFAULT_SETTINGS
+    assert path is None
+
+
+def test_apply_env_overrides_omp_threads(monkeypatch):
+    monkeypatch.setenv('OMP_NUM_THREADS', '8')
+    monkeypatch.delenv('TF_ENABLE_ONEDNN_OPTS', raising=False)
+    inference_tuning.apply_env({'intra_op_threads': 2, 'onednn': False})
+    assert os.environ['OMP_NUM_THREADS'] == '2'
+    assert os.environ['TF_ENABLE_ONEDNN_OPTS'] == '0'
+
+
+def test_apply_env_leaves_defaults_alone(monkeypatch):
+    monkeypatch.setenv('OMP_NUM_THREADS', '8')
+    monkeypatch.delenv('TF_ENABLE_ONEDNN_OPTS', raising=False)
+    inference_tuning.apply_env(inference_tuning.DEFAULT_SETTINGS)
+    assert os.environ['OMP_NUM_THREADS'] == '8'
+    assert 'TF_ENABLE_ONEDNN_OPTS' not in os.environ
+
+
+def test_percentile():
+    values = [5, 1, 3, 2, 4]
+    assert inference_tuning.percentile(values, 50) == 3
+    assert inference_tuning.percentile(values, 95) == 5
+    assert inference_tuning.percentile([7], 95) == 7
+
+
+def test_autotune_picks_lowest_tail_latency(tmp_path, monkeypatch):
+    # p95 at batch 1 by intra-op thread count; batch 8 numbers must not matter
+    p95 = {1: 30.0, 2: 12.0, 4: 12.0}
+    p50 = {1: 20.0, 2: 9.0, 4: 8.0}
+
+    def fake_run(settings, args):
+        threads = settings['intra_op_threads']
+        return {
+            'results': {
+                '1': {'p50_ms': p50[threads], 'p95_ms': p95[threads], 'images_per_sec': 50},
+                '8': {'p50_ms': 1.0, 'p95_ms': 1.0 if threads == 1 else 99.0, 'images_per_sec': 400}
+            },
+            'tensorflow_version': 'test'
+        }
+
+    monkeypatch.setattr(inference_tuning, 'run_candidate', fake_run)
+    output = tmp_path / 'profile.json'
+    args = argparse.Namespace(threads=[1, 2, 4], inter_threads=[1], batch_sizes=[1, 8],
+                              onednn_sweep=False, xla_sweep=False, output=str(output))
+
+    profile = inference_tuning.autotune(args)
+
+    # Tie on p95 is broken by p50
+    assert profile['settings']['intra_op_threads'] == 4
+    assert profile['score'] == {'batch_size': 1, 'p50_ms': 8.0, 'p95_ms': 12.0, 'images_per_sec': 50}
+    assert json.loads(output.read_text())['settings'] == profile['settings']
+    assert len(profile['benchmarks']) == 3
+
+
+def test_autotune_with_no_results_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(inference_tuning, 'run_candidate', lambda settings, args: None)
+    output = tmp_path / 'profile.json'
+    args = argparse.Namespace(threads=[1], inter_threads=[1], batch_sizes=[1],
+                              onednn_sweep=False, xla_sweep=False, output=str(output))
+    assert inference_tuning.autotune(args) is None
+    assert not output.exists()
@@ -0,0 +1,108 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+import pytest
+
+import request_logging
+from request_logging import DroppingQueueHandler, JsonFormatter, RequestContextFilter
+
+
+@pytest.fixture
+def handler():
+    """A queue handler on an isolated logger, with no listener draining it"""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    handler.addFilter(RequestContextFilter())
+    logger = logging.getLogger('macromate.test')
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    logger.propagate = False
+    yield handler
+    logger.removeHandler(handler)
+
+
+def drain(handler):
+    records = []
+    while not handler.queue.empty():
+        records.append(handler.queue.get_nowait())
+    return records
+
+
+def test_full_queue_drops_without_blocking(handler):
+    logger = logging.getLogger('macromate.test')
+    start = time.perf_counter()
+    for i in range(50):
+        logger.info('flood %d', i)
+    assert time.perf_counter() - start < 1.0
+    assert [r.msg for r in drain(handler)] == ['flood 0', 'flood 1']
+
+    logger.info('after')
+    (record,) = drain(handler)
+    assert record.msg == 'after'
+    assert record.dropped_logs == 48
+
+
+def test_concurrent_drops_are_all_counted(handler):
+    logger = logging.getLogger('macromate.test')
+    logger.info('fill 1')
+    logger.info('fill 2')
+
+    def flood():
+        for _ in range(500):
+            logger.info('dropped')
+
+    threads = [threading.Thread(target=flood) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    drain(handler)
+    logger.info('after')
+    assert drain(handler)[0].dropped_logs == 8 * 500
+
+
+def test_sampling_keeps_warnings(handler):
+    logger = logging.getLogger('macromate.test')
+    token = request_logging.sampled_var.set(False)
+    try:
+        logger.debug('debug')
+        logger.info('info')
+        logger.warning('warning')
+        logger.error('error')
+    finally:
+        request_logging.sampled_var.reset(token)
+    assert [r.msg for r in drain(handler)] == ['warning', 'error']
+
+
+def test_request_id_attached_and_formatted(handler):
+    logger = logging.getLogger('macromate.test')
+    token = request_logging.request_id_var.set('req-123')
+    try:
+        logger.info('hello %s', 'world', extra={'duration_ms': 1.5})
+    finally:
+        request_logging.request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(drain(handler)[0]))
+    assert entry['msg'] == 'hello world'
+    assert entry['request_id'] == 'req-123'
+    assert entry['duration_ms'] == 1.5
+
+
+def test_flask_request_id_carried_onto_records(handler):
+    flask = pytest.importorskip('flask')
+    app = flask.Flask(__name__)
+    request_logging.init_app(app)
+    logger = logging.getLogger('macromate.test')
+
+    @app.route('/ping')
+    def ping():
+        logger.info('in handler')
+        return 'ok'
+
+    response = app.test_client().get('/ping', headers={'X-Request-ID': 'abc123'})
+    assert response.headers['X-Request-ID'] == 'abc123'
+    assert drain(handler)[0].request_id == 'abc123'
+    request_logging.shutdown_logging()